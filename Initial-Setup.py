@@ -1,23 +1,190 @@
 import os
+import sys
 from dotenv import load_dotenv
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
 from pypdf import PdfReader
 from docx import Document
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from transformers import AutoTokenizer
+from huggingface_hub import hf_hub_download
+import onnxruntime as ort
 import numpy as np
+import faiss
 import json
 import asyncio
+import copy
+import functools
+import hashlib
+import mmap
+import multiprocessing
+from contextlib import contextmanager
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 # For Gemini API integration
 import google.generativeai as genai
 from langchain_google_generativeai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.runnables import Runnable
+from langchain_core.output_parsers import PydanticOutputParser
+from pydantic import BaseModel, Field
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Sentence embedding model used for originality checks
+SENTENCE_MODEL_NAME = 'all-MiniLM-L6-v2'
+SENTENCE_MODEL_HUB_ID = f'sentence-transformers/{SENTENCE_MODEL_NAME}'
+# int8 (AVX-512 VNNI) quantized weights published alongside the model on the Hub
+HUB_QUANTIZED_MODEL_FILE = 'onnx/model_qint8_avx512_vnni.onnx'
+# Locally exported graph-optimized + int8 quantized model (see export_quantized_sentence_model)
+QUANTIZED_MODEL_DIR = os.getenv("QUANTIZED_MODEL_DIR", os.path.join("models", f"{SENTENCE_MODEL_NAME}-quantized"))
+QUANTIZED_MODEL_FILE = 'model_optimized_quantized.onnx'
+# Full-precision ONNX weights, used on GPU where the int8 kernels above are not supported
+HUB_GPU_MODEL_FILE = 'onnx/model.onnx'
+# Maximum number of pitch embeddings kept in the in-memory LRU cache
+EMBEDDING_CACHE_SIZE = 1024
+# Batch size used when running the embedding model
+EMBEDDING_BATCH_SIZE = 32
+# Micro-batching of concurrent pitch embeddings: flush at this many requests or after this wait
+MAX_BATCH = 32
+MAX_WAIT_MS = 50
+# Maximum sequence length (in tokens) fed to the embedding model
+EMBEDDING_MAX_TOKENS = 256
+# Maximum pitch length (in embedding-model tokens) sent to the LLM; gemini-pro allows 32k
+LLM_MAX_TOKENS = 4000
+# Character cut applied before tokenizing, so huge documents are never fully tokenized;
+# comfortably above LLM_MAX_TOKENS tokens of ordinary text
+LLM_MAX_CHARS = LLM_MAX_TOKENS * 10
+# Components scored by the LLM in a single combined call
+LLM_SCORED_COMPONENTS = ('clarity', 'team_strength', 'market_fit')
+# Cap on LLM output tokens; the response is three scores with short reasonings
+LLM_MAX_OUTPUT_TOKENS = 384
+# PDFs with fewer pages than this are extracted serially to avoid process pool overhead
+MIN_PAGES_FOR_MULTIPROCESSING = 4
+
+
+class Score(BaseModel):
+    """A single LLM-assigned component score."""
+    score: int = Field(ge=1, le=10, description="Score on a scale of 1 to 10.")
+    reasoning: str = Field(description="Brief reasoning for the score.")
+
+
+class PitchScores(BaseModel):
+    """Schema of the combined LLM scoring response."""
+    clarity: Score
+    team_strength: Score
+    market_fit: Score
+
+
+@contextmanager
+def _open_pdf(file_path: str) -> Iterator[PdfReader]:
+    """
+    Opens a PDF over a read-only memory map, so the OS only pages in the objects
+    that text extraction actually touches (fonts/images are otherwise left on disk).
+    """
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield PdfReader(mm, strict=False)
+
+
+def _extract_pdf_page_text(file_path: str, page_index: int) -> str:
+    """Extracts the text of a single PDF page. Runs in a worker process."""
+    with _open_pdf(file_path) as reader:
+        return reader.pages[page_index].extract_text() or ""
+
+@functools.lru_cache(maxsize=1)
+def _get_pdf_executor() -> ProcessPoolExecutor:
+    """
+    Returns the shared process pool for PDF page extraction, created on first use.
+    Workers are started through forkserver (spawn where unavailable) rather than forking
+    a process that already runs ORT and tokenizer threads, and only on demand, so a
+    short deck starts no more workers than it has pages.
+    """
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    max_workers = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(start_method))
+
+def export_quantized_sentence_model(output_dir: str = QUANTIZED_MODEL_DIR) -> str:
+    """
+    Exports the originality model to ONNX, applies ORT graph optimizations and
+    dynamic int8 (AVX-512 VNNI) quantization, and saves the result in output_dir.
+    Only needs to run once per deployment; NLPProcessor picks the model up on start.
+    """
+    # optimum is only needed for this one-off export step
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTOptimizer, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig, OptimizationConfig
+
+    model = ORTModelForFeatureExtraction.from_pretrained(SENTENCE_MODEL_HUB_ID, export=True)
+    AutoTokenizer.from_pretrained(SENTENCE_MODEL_HUB_ID).save_pretrained(output_dir)
+
+    optimizer = ORTOptimizer.from_pretrained(model)
+    optimizer.optimize(save_dir=output_dir, optimization_config=OptimizationConfig(optimization_level=99))
+
+    quantizer = ORTQuantizer.from_pretrained(output_dir, file_name="model_optimized.onnx")
+    quantizer.quantize(
+        save_dir=output_dir,
+        quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False),
+    )
+    print(f"NLPProcessor: Exported optimized and quantized model to {output_dir}")
+    return os.path.join(output_dir, QUANTIZED_MODEL_FILE)
+
+class BatchEmbedder:
+    """
+    Collects concurrent embedding requests into micro-batches. Requests are queued and a
+    background consumer runs embed_fn once per batch of up to max_batch texts, waiting at
+    most max_wait_ms for a batch to fill, then resolves each request's future with its row.
+    """
+    def __init__(self, embed_fn: Callable[[List[str]], np.ndarray],
+                 max_batch: int = MAX_BATCH, max_wait_ms: int = MAX_WAIT_MS):
+        self._embed_fn = embed_fn
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_consumer(self):
+        # The queue and consumer task belong to one event loop; start fresh ones when
+        # called from a new loop (e.g. successive asyncio.run calls).
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._consumer is None or self._consumer.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._consumer = loop.create_task(self._consume())
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Returns the embedding row for text, computed together with any concurrent requests."""
+        self._ensure_consumer()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _consume(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self._max_wait
+            while len(batch) < self._max_batch:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                # Run the model off the event loop so other pitches keep progressing
+                embeddings = await asyncio.to_thread(self._embed_fn, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+
 class NLPProcessor:
     def __init__(self):
         # Configure Gemini API
@@ -30,80 +197,183 @@ class NLPProcessor:
         else:
              genai.configure(api_key=self.gemini_api_key)
 
-        # Initialize the Sentence Transformer for originality checks
-        self.sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
-        print("NLPProcessor: Loaded Sentence Transformer model for originality.")
+        # Initialize the sentence embedding model for originality checks.
+        # The ONNX graph is run directly through an ORT InferenceSession (tokenization and
+        # mean pooling are done here in NumPy). On GPU (onnxruntime-gpu installed), run the
+        # full-precision weights on CUDA. On CPU, use int8 (AVX-512 VNNI) quantized weights:
+        # the locally exported optimized + quantized model if present, otherwise the Hub's
+        # quantized file. ORT applies all graph fusions; its default intra-op thread pool
+        # already sizes itself to the physical cores, so the thread count is left unset.
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        use_cuda = "CUDAExecutionProvider" in ort.get_available_providers()
+        if use_cuda:
+            providers = ["CUDAExecutionProvider", "CPUExecutionProvider"]
+            model_path = hf_hub_download(SENTENCE_MODEL_HUB_ID, HUB_GPU_MODEL_FILE)
+        elif os.path.exists(os.path.join(QUANTIZED_MODEL_DIR, QUANTIZED_MODEL_FILE)):
+            providers = ["CPUExecutionProvider"]
+            model_path = os.path.join(QUANTIZED_MODEL_DIR, QUANTIZED_MODEL_FILE)
+        else:
+            providers = ["CPUExecutionProvider"]
+            model_path = hf_hub_download(SENTENCE_MODEL_HUB_ID, HUB_QUANTIZED_MODEL_FILE)
+        self.tokenizer = AutoTokenizer.from_pretrained(SENTENCE_MODEL_HUB_ID)
+        # A fast tokenizer keeps truncation/padding settings as mutable state, and _embed runs on
+        # a worker thread while _truncate_by_tokens runs on the event loop; give _embed its own copy.
+        self._embed_tokenizer = copy.deepcopy(self.tokenizer)
+        self.ort_session = ort.InferenceSession(model_path, sess_options=session_options, providers=providers)
+        self._ort_input_names = {model_input.name for model_input in self.ort_session.get_inputs()}
+        print(f"NLPProcessor: Loaded ONNX embedding model for originality ({providers[0]}).")
+
+        # Simulate a corpus of existing pitches (in a real system, this comes from a Vector DB).
+        # The corpus is fixed, so encode it once here and load it into a FAISS inner-product
+        # index; embeddings are L2-normalized so inner product equals cosine similarity.
+        self.existing_pitches_corpus = [
+            "Our decentralized finance protocol revolutionizes lending and borrowing on blockchain.",
+            "AI-powered medical diagnostics for early disease detection using patient data.",
+            "A platform connecting artists and fans in the metaverse through NFTs.",
+            "Revolutionizing retail with AR/VR shopping experiences.",
+            "Building a new social network focused on privacy and user ownership of data.",
+            "A sustainable energy solution leveraging advanced solar panel technology.",
+        ]
+        corpus_embeddings = self._embed(self.existing_pitches_corpus)
+        self.corpus_index = faiss.IndexFlatIP(corpus_embeddings.shape[1])
+        self.corpus_index.add(corpus_embeddings)
+        print("NLPProcessor: Encoded existing pitches corpus.")
+
+        # SHA-256 of pitch text -> normalized embedding, so repeat analyses skip the model
+        self._emb_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Concurrent pitch analyses share embedding model runs
+        self.batch_embedder = BatchEmbedder(self._embed)
 
         # Initialize LangChain's Gemini LLM for complex text analysis
-        self.llm = ChatGoogleGenerativeAI(model="gemini-pro", temperature=0.2) # Use gemini-pro for text tasks
-
-        # Define prompts for LLM-based scoring
-        self.clarity_prompt = PromptTemplate(
-            template="""You are an expert pitch evaluator.
-            Assess the clarity and structure of the following startup pitch.
-            Score it on a scale of 1 to 10 (10 being perfectly clear and well-structured).
-            Provide a brief reasoning for the score.
-            Format your response as a JSON object with keys 'score' (integer) and 'reasoning' (string).
-
-            Pitch:
-            {pitch_text}
-            """,
-            input_variables=["pitch_text"],
+        self.llm = ChatGoogleGenerativeAI(
+            model="gemini-pro", # Use gemini-pro for text tasks
+            temperature=0.2,
+            max_output_tokens=LLM_MAX_OUTPUT_TOKENS,
         )
 
-        self.team_strength_prompt = PromptTemplate(
-            template="""You are an expert pitch evaluator focused on team assessment.
-            Analyze the following pitch for explicit and implicit indicators of team strength (experience, relevant background, cohesion, previous successes).
-            Score it on a scale of 1 to 10 (10 being an exceptionally strong team).
-            Provide a brief reasoning for the score.
-            Format your response as a JSON object with keys 'score' (integer) and 'reasoning' (string).
+        # Parse the response strictly against the PitchScores schema
+        self.score_parser = PydanticOutputParser(pydantic_object=PitchScores)
 
-            Pitch:
-            {pitch_text}
-            """,
-            input_variables=["pitch_text"],
-        )
+        # Define a single prompt that scores clarity, team strength and market fit together,
+        # so the pitch text is sent to the LLM once per analysis.
+        self.scoring_prompt = PromptTemplate(
+            template="""You are an expert pitch evaluator.
+            Evaluate the following startup pitch on three criteria, scoring each on a scale of 1 to 10:
+            - clarity: the clarity and structure of the pitch (10 being perfectly clear and well-structured).
+            - team_strength: explicit and implicit indicators of team strength (experience, relevant background, cohesion, previous successes) (10 being an exceptionally strong team).
+            - market_fit: its understanding of the market, problem-solution fit, and competitive landscape (10 being an outstanding market fit).
+            Provide a brief reasoning for each score.
 
-        self.market_fit_prompt = PromptTemplate(
-            template="""You are an expert pitch evaluator focused on market fit.
-            Evaluate the following pitch for its understanding of the market, problem-solution fit, and competitive landscape.
-            Score it on a scale of 1 to 10 (10 being an outstanding market fit).
-            Provide a brief reasoning for the score.
-            Format your response as a JSON object with keys 'score' (integer) and 'reasoning' (string).
+            {format_instructions}
 
             Pitch:
             {pitch_text}
             """,
             input_variables=["pitch_text"],
+            partial_variables={"format_instructions": self.score_parser.get_format_instructions()},
         )
 
-        self.json_parser = JsonOutputParser()
+        # Compose the scoring chain once; it is reused for every analysis
+        self.scoring_chain = self.scoring_prompt | self.llm | self.score_parser
+
         print("NLPProcessor: Initialized LLM and scoring prompts.")
 
 
-    async def _call_llm_for_score(self, prompt: PromptTemplate, pitch_text: str) -> Dict[str, Any]:
-        """Helper to call LLM with a specific prompt and parse JSON output."""
+    async def _call_llm_for_scores(self, chain: Runnable, pitch_text: str) -> Dict[str, Dict[str, Any]]:
+        """Helper to run a precompiled scoring chain and return its output per component."""
         try:
-            chain = prompt | self.llm | self.json_parser
             response = await chain.ainvoke({"pitch_text": pitch_text})
-            return response
+            return {component: getattr(response, component).model_dump() for component in LLM_SCORED_COMPONENTS}
         except Exception as e:
             print(f"Error calling LLM for scoring: {e}")
-            return {"score": 0, "reasoning": f"LLM error: {e}"}
-
-    def _extract_text_from_doc(self, file_path: str) -> str:
-        """Extracts text from PDF, DOCX, or TXT files."""
+            return {component: {"score": 0, "reasoning": f"LLM error: {e}"} for component in LLM_SCORED_COMPONENTS}
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Returns L2-normalized float32 mean-pooled embeddings for texts, shape (len(texts), dim)."""
+        batches = []
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            inputs = self._embed_tokenizer(
+                texts[start:start + EMBEDDING_BATCH_SIZE],
+                padding=True,
+                truncation=True,
+                max_length=EMBEDDING_MAX_TOKENS,
+                return_tensors='np',
+            )
+            feed = {name: array.astype(np.int64, copy=False)
+                    for name, array in inputs.items() if name in self._ort_input_names}
+            last_hidden = self.ort_session.run(None, feed)[0]
+
+            # Mean-pool over real tokens only, then L2-normalize
+            mask = inputs['attention_mask'].astype(np.float32)
+            summed = np.einsum('bsd,bs->bd', last_hidden, mask)
+            pooled = summed / np.clip(mask.sum(axis=1, keepdims=True), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32, copy=False))
+        return np.concatenate(batches, axis=0)
+
+    def _truncate_by_tokens(self, pitch_text: str) -> Tuple[str, str]:
+        """
+        Tokenizes pitch_text once and returns (embed_text, llm_text), the original text cut
+        at EMBEDDING_MAX_TOKENS and LLM_MAX_TOKENS tokens respectively. Cuts use the token
+        character offsets, so the LLM still sees the original casing and spacing.
+        """
+        # The fast tokenizer encodes the whole input before truncating; cut by characters first
+        pitch_text = pitch_text[:LLM_MAX_CHARS]
+        offsets = self.tokenizer(
+            pitch_text,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=LLM_MAX_TOKENS,
+            return_offsets_mapping=True,
+        )['offset_mapping']
+        if not offsets:
+            return pitch_text, pitch_text
+        embed_end = offsets[min(EMBEDDING_MAX_TOKENS, len(offsets)) - 1][1]
+        return pitch_text[:embed_end], pitch_text[:offsets[-1][1]]
+
+    async def _get_pitch_embedding(self, pitch_text: str) -> np.ndarray:
+        """Returns the normalized embedding for pitch_text, using the LRU cache when possible."""
+        text_hash = hashlib.sha256(pitch_text.encode('utf-8')).hexdigest()
+        pitch_embedding = self._emb_cache.get(text_hash)
+        if pitch_embedding is not None:
+            self._emb_cache.move_to_end(text_hash)
+            return pitch_embedding
+
+        # Store in the (1, dim) float32 layout FAISS expects, so searches need no conversion.
+        # The row is a view into its batch array; copy it so the cache does not keep the batch alive.
+        pitch_embedding = (await self.batch_embedder.embed(pitch_text)).reshape(1, -1).copy()
+        self._emb_cache[text_hash] = pitch_embedding
+        if len(self._emb_cache) > EMBEDDING_CACHE_SIZE:
+            self._emb_cache.popitem(last=False)
+        return pitch_embedding
+
+    @staticmethod
+    def extract_text_from_doc(file_path: str) -> str:
+        """Extracts text from PDF, DOCX, or TXT files. Needs no models, so callers can load a pitch without an NLPProcessor."""
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
 
-        text = ""
+        # Every branch builds the text in a single join/read rather than concatenating pieces
         if file_path.endswith('.pdf'):
-            reader = PdfReader(file_path)
-            for page in reader.pages:
-                text += page.extract_text() or ""
+            with _open_pdf(file_path) as reader:
+                num_pages = len(reader.pages)
+                text = None
+                if num_pages >= MIN_PAGES_FOR_MULTIPROCESSING:
+                    executor = _get_pdf_executor()
+                    try:
+                        text = "".join(executor.map(_extract_pdf_page_text, [file_path] * num_pages, range(num_pages)))
+                    except BrokenProcessPool as e:
+                        # A worker died (e.g. OOM-killed); drop the pool so the next PDF gets a
+                        # fresh one, and extract this document serially instead.
+                        print(f"NLPProcessor: PDF process pool broke ({e}); extracting {file_path} serially.")
+                        _get_pdf_executor.cache_clear()
+                        executor.shutdown(wait=False, cancel_futures=True)
+                if text is None:
+                    text = "".join(page.extract_text() or "" for page in reader.pages)
         elif file_path.endswith('.docx'):
             doc = Document(file_path)
-            text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
+            text = "\n".join(paragraph.text for paragraph in doc.paragraphs)
         elif file_path.endswith('.txt'):
             with open(file_path, 'r', encoding='utf-8') as f:
                 text = f.read()
@@ -114,25 +384,29 @@ class NLPProcessor:
     async def analyze_pitch(self, pitch_id: str, pitch_content: str = None, file_path: str = None) -> Dict[str, Any]:
         """
         Analyzes a pitch for clarity, team strength, market fit, and originality.
-        Takes either direct pitch_content (string) or a file_path.
+        Takes either direct pitch_content (string) or a file_path; pitch_content wins
+        when both are given, so callers that already extracted the text skip the file.
         """
-        if file_path:
+        if pitch_content:
+            pitch_text = pitch_content
+            print("NLPProcessor: Using provided pitch content string.")
+        elif file_path:
             try:
-                pitch_text = self._extract_text_from_doc(file_path)
+                # Extraction is blocking (and may wait on the PDF process pool); keep it off the event loop
+                pitch_text = await asyncio.to_thread(self.extract_text_from_doc, file_path)
                 print(f"NLPProcessor: Extracted text from file: {file_path}")
             except Exception as e:
                 print(f"NLPProcessor: Error extracting text from {file_path}: {e}")
                 return {"error": str(e)}
-        elif pitch_content:
-            pitch_text = pitch_content
-            print("NLPProcessor: Using provided pitch content string.")
         else:
             return {"error": "No pitch content or file path provided."}
+        if not pitch_text.strip():
+            # Nothing to score; don't spend an LLM call on an empty pitch
+            return {"error": "No pitch content or file path provided."}
 
-        # Truncate pitch_text if too long for LLM context window,
-        # or for originality check to manage memory.
-        # Max tokens for gemini-pro is 32k. For simplicity, let's keep it under 10k chars.
-        processed_pitch_text = pitch_text[:10000]
+        # Truncate pitch_text by token budget: a short prefix is enough for the embedding
+        # model (longer input is dropped by it anyway), the LLM gets a larger budget.
+        embed_text, llm_text = self._truncate_by_tokens(pitch_text)
 
         scores = {
             "pitch_id": pitch_id,
@@ -141,35 +415,15 @@ class NLPProcessor:
         }
 
         # --- Component Scoring using LLM ---
-        print("NLPProcessor: Calling LLM for clarity score...")
-        clarity_result = await self._call_llm_for_score(self.clarity_prompt, processed_pitch_text)
-        scores['components']['clarity'] = clarity_result
-
-        print("NLPProcessor: Calling LLM for team strength score...")
-        team_strength_result = await self._call_llm_for_score(self.team_strength_prompt, processed_pitch_text)
-        scores['components']['team_strength'] = team_strength_result
-
-        print("NLPProcessor: Calling LLM for market fit score...")
-        market_fit_result = await self._call_llm_for_score(self.market_fit_prompt, processed_pitch_text)
-        scores['components']['market_fit'] = market_fit_result
+        print("NLPProcessor: Calling LLM for clarity, team strength and market fit scores...")
+        scores['components'].update(await self._call_llm_for_scores(self.scoring_chain, llm_text))
 
         # --- Originality Score (Vector Embedding + Similarity) ---
         print("NLPProcessor: Calculating originality score...")
         try:
-            # Simulate a corpus of existing pitches (in a real system, this comes from a Vector DB)
-            existing_pitches_corpus = [
-                "Our decentralized finance protocol revolutionizes lending and borrowing on blockchain.",
-                "AI-powered medical diagnostics for early disease detection using patient data.",
-                "A platform connecting artists and fans in the metaverse through NFTs.",
-                "Revolutionizing retail with AR/VR shopping experiences.",
-                "Building a new social network focused on privacy and user ownership of data.",
-                "A sustainable energy solution leveraging advanced solar panel technology.",
-            ]
-            pitch_embedding = self.sentence_model.encode(processed_pitch_text, convert_to_tensor=True)
-            corpus_embeddings = self.sentence_model.encode(existing_pitches_corpus, convert_to_tensor=True)
-
-            similarities = cosine_similarity(pitch_embedding.unsqueeze(0), corpus_embeddings)
-            max_similarity = np.max(similarities)
+            pitch_embedding = await self._get_pitch_embedding(embed_text)
+            similarities, _ = self.corpus_index.search(pitch_embedding, 1)
+            max_similarity = float(similarities[0, 0])
             # Higher similarity means less original. Scale to 1-10.
             # A perfect match (similarity 1) means score 1. No similarity (similarity 0) means score 10.
             scores['components']['originality'] = {
@@ -231,5 +485,8 @@ async def test_nlp_processor():
     os.remove("dummy_pitch_poor.txt")
 
 if __name__ == "__main__":
-    asyncio.run(test_nlp_processor())
+    if "--export-quantized-model" in sys.argv:
+        export_quantized_sentence_model()
+    else:
+        asyncio.run(test_nlp_processor())
 
@@ -1,36 +1,59 @@
 import asyncio
+import functools
+import hashlib
 import json
 import os
-from typing import Dict, Any, List, Literal
+import threading
+from typing import Dict, Any, List, Literal, TypedDict
 
-from langchain_core.pydantic_v1 import BaseModel, Field
+import orjson
 from langchain_core.messages import BaseMessage, HumanMessage
 from langgraph.graph import StateGraph, END
 
 # Import our custom NLPProcessor
 # Ensure nlp_processor.py is in the same directory or accessible via PYTHONPATH
-from nlp_processor import NLPProcessor
+from nlp_processor import LLM_MAX_CHARS, NLPProcessor
 
 # --- 1. Define Agent State ---
-class AgentState(BaseModel):
+class AgentState(TypedDict, total=False):
     """
     Represents the state of the Pitch Strength Agent's workflow.
+    A plain TypedDict: LangGraph merges each node's returned dict into it without
+    validating or copying the state on every step. Only pitch_id is always set.
     """
-    pitch_id: str = Field(description="Unique identifier for the pitch being analyzed.")
-    pitch_content: str = Field(None, description="Raw text content of the pitch.")
-    file_path: str = Field(None, description="Path to the pitch file (PDF, DOCX, TXT).")
-    analysis_results: Dict[str, Any] = Field(None, description="Detailed pitch analysis scores.")
-    zkp_hash: str = Field(None, description="Hash of the generated ZKP for the scores.")
-    tee_processed: bool = Field(False, description="Flag indicating if pitch was processed securely in a TEE.")
-    error: str = Field(None, description="Any error message encountered during processing.")
+    pitch_id: str # Unique identifier for the pitch being analyzed.
+    pitch_content: str # Raw text content of the pitch.
+    file_path: str # Path to the pitch file (PDF, DOCX, TXT).
+    analysis_results: Dict[str, Any] # Detailed pitch analysis scores.
+    zkp_hash: str # Hash of the generated ZKP for the scores.
+    tee_processed: bool # Flag indicating if pitch was processed securely in a TEE.
+    error: str # Any error message encountered during processing.
     # Add a field for the raw, encrypted pitch content for TEE/Decentralized Storage
-    encrypted_pitch_cid: str = Field(None, description="CID of the encrypted pitch on decentralized storage (e.g., IPFS).")
+    encrypted_pitch_cid: str # CID of the encrypted pitch on decentralized storage (e.g., IPFS).
+    # Outputs of the record_on_chain and output_results nodes
+    status: str # Workflow status ("completed" or "failed").
+    on_chain_tx_hash: str # Transaction hash of the on-chain score record.
+    overall_score: int # Final overall pitch score.
+    component_scores: Dict[str, int] # Final per-component scores.
+    privacy_flags: Dict[str, Any] # TEE / ZKP metadata for the final output.
 
 
 # --- 2. Initialize Tools / Services ---
-# Instantiate the NLPProcessor. In a real deployment, this might be a service call
+# Lazily instantiate a single shared NLPProcessor. In a real deployment, this might be a service call
 # to an NLP service running within a TEE or a ZKP-friendly computation environment.
-nlp_processor_instance = NLPProcessor() # This instance will conceptually run in a TEE or be ZKP-compatible
+# Importing this module stays cheap; the first analysis pays for model loading instead, which the
+# nodes run in a worker thread (asyncio.to_thread(get_nlp_processor)) so the event loop keeps serving.
+_nlp_processor_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _create_nlp_processor() -> NLPProcessor:
+    return NLPProcessor() # This instance will conceptually run in a TEE or be ZKP-compatible
+
+def get_nlp_processor() -> NLPProcessor:
+    """Returns the shared NLPProcessor, loading its models on first use only. Blocking; call it off the event loop."""
+    # The lock keeps concurrent first requests from each building their own processor
+    with _nlp_processor_lock:
+        return _create_nlp_processor()
 
 # Mock Ethereum interaction (replace with web3.py in real app)
 class MockWeb3:
@@ -66,18 +89,30 @@ async def load_and_preprocess_pitch(state: AgentState) -> AgentState:
     For this mock, we'll continue using file_path/pitch_content for demonstration,
     but conceptualize the encryption/upload happening before this node.
     """
-    print(f"\n[Pitch Strength Agent] Loading pitch for ID: {state.pitch_id}")
-    if state.file_path:
+    print(f"\n[Pitch Strength Agent] Loading pitch for ID: {state['pitch_id']}")
+    if state.get("file_path"):
         # Conceptual: This is where client-side encryption and IPFS upload would happen.
-        # For demo, NLPProcessor will still read from file.
-        print(f"[Pitch Strength Agent] Using file path: {state.file_path}")
+        # For demo, extract the text once here so downstream nodes never re-read the file.
+        print(f"[Pitch Strength Agent] Using file path: {state['file_path']}")
+        try:
+            # Extraction is blocking (and may wait on the PDF process pool); keep it off the event loop
+            pitch_text = await asyncio.to_thread(NLPProcessor.extract_text_from_doc, state["file_path"])
+        except Exception as e:
+            return {"error": f"Failed to load pitch file {state['file_path']}: {e}"}
+        if not pitch_text.strip():
+            # e.g. an empty file or an image-only (scanned) PDF deck
+            return {"error": f"No text could be extracted from {state['file_path']}"}
         # Assuming encrypted_pitch_cid is obtained here from decentralized storage
-        return {"encrypted_pitch_cid": f"ipfs://{state.pitch_id}_encrypted_pitch.bin"}
-    elif state.pitch_content:
+        return {
+            # Keep only what analyze_pitch can use; it truncates further by token budget
+            "pitch_content": pitch_text[:LLM_MAX_CHARS],
+            "encrypted_pitch_cid": f"ipfs://{state['pitch_id']}_encrypted_pitch.bin"
+        }
+    elif state.get("pitch_content"):
         # Conceptual: This is where client-side encryption and IPFS upload would happen.
         # For demo, NLPProcessor will use string content.
         print("[Pitch Strength Agent] Using provided pitch content string.")
-        return {"encrypted_pitch_cid": f"ipfs://{state.pitch_id}_encrypted_pitch_string.bin"}
+        return {"encrypted_pitch_cid": f"ipfs://{state['pitch_id']}_encrypted_pitch_string.bin"}
     else:
         return {"error": "No pitch content or file path provided to the agent."}
 
@@ -86,13 +121,13 @@ async def process_with_tee(state: AgentState) -> AgentState:
     Simulates processing the *encrypted* pitch content within a Trusted Execution Environment (TEE).
     This is where the actual decryption and NLP analysis would happen in a secure enclave.
     """
-    print(f"\n[Pitch Strength Agent] Initiating TEE processing for pitch ID: {state.pitch_id} (CID: {state.encrypted_pitch_cid})...")
-    if state.error:
+    print(f"\n[Pitch Strength Agent] Initiating TEE processing for pitch ID: {state['pitch_id']} (CID: {state.get('encrypted_pitch_cid')})...")
+    if state.get("error"):
         print("[Pitch Strength Agent] Skipping TEE due to prior error.")
         return {} # Pass through if there's an error
     try:
         # --- CONCEPTUAL TEE LOGIC ---
-        # 1. The agent securely requests the encrypted pitch data associated with state.encrypted_pitch_cid
+        # 1. The agent securely requests the encrypted pitch data associated with the state's encrypted_pitch_cid
         #    from decentralized storage.
         # 2. This data is streamed into the TEE.
         # 3. Inside the TEE, the pitch is *decrypted* using a key that was securely provided
@@ -100,10 +135,11 @@ async def process_with_tee(state: AgentState) -> AgentState:
         # 4. The NLPProcessor.analyze_pitch() is called *within the TEE* on the decrypted text.
         #    For this mock, we'll call it here as if it's running in the TEE.
         print(f"[Pitch Strength Agent] TEE: Decrypting and analyzing pitch content...")
-        results = await nlp_processor_instance.analyze_pitch(
-            pitch_id=state.pitch_id,
-            pitch_content=state.pitch_content, # In real TEE, this would be decrypted from CID
-            file_path=state.file_path # In real TEE, this would be decrypted from CID
+        processor = await asyncio.to_thread(get_nlp_processor)
+        results = await processor.analyze_pitch(
+            pitch_id=state["pitch_id"],
+            pitch_content=state.get("pitch_content"), # In real TEE, this would be decrypted from CID
+            file_path=None # Text was already extracted by load_and_preprocess_pitch
         )
 
         if "error" in results:
@@ -112,7 +148,7 @@ async def process_with_tee(state: AgentState) -> AgentState:
 
         # 5. The TEE would then output the analysis results, potentially re-encrypted,
         #    or serve as the environment for ZKP generation directly on the results.
-        print(f"[Pitch Strength Agent] Pitch {state.pitch_id} processed within TEE.")
+        print(f"[Pitch Strength Agent] Pitch {state['pitch_id']} processed within TEE.")
         return {
             "tee_processed": True,
             "analysis_results": results # Results are now conceptually 'secured' by TEE context
@@ -125,8 +161,8 @@ async def generate_zkp_for_scores(state: AgentState) -> AgentState:
     Generates a Zero-Knowledge Proof for the calculated pitch scores.
     This step would ideally happen within or after the TEE processing to maintain privacy.
     """
-    print(f"\n[Pitch Strength Agent] Initiating ZKP generation for pitch ID: {state.pitch_id}...")
-    if state.error or not state.analysis_results:
+    print(f"\n[Pitch Strength Agent] Initiating ZKP generation for pitch ID: {state['pitch_id']}...")
+    if state.get("error") or not state.get("analysis_results"):
         print("[Pitch Strength Agent] Skipping ZKP due to prior error or missing analysis results.")
         return {} # Pass through if there's an error or no analysis
 
@@ -146,15 +182,17 @@ async def generate_zkp_for_scores(state: AgentState) -> AgentState:
         
         # MOCK ZKP Generation (replace with actual ZKP library calls)
         mock_proof_data = {
-            "overall": state.analysis_results.get("overall_score"),
-            "clarity": state.analysis_results.get("components", {}).get("clarity", {}).get("score"),
-            "originality": state.analysis_results.get("components", {}).get("originality", {}).get("score")
+            "overall": state["analysis_results"].get("overall_score"),
+            "clarity": state["analysis_results"].get("components", {}).get("clarity", {}).get("score"),
+            "originality": state["analysis_results"].get("components", {}).get("originality", {}).get("score")
         }
-        # A hash of the public inputs for the ZKP
-        zkp_public_inputs_hash = hashlib.sha256(json.dumps(mock_proof_data, sort_keys=True).encode()).hexdigest()
+        # A hash of the public inputs for the ZKP, over canonical (sorted-key) JSON bytes.
+        # Hashing runs off the event loop; a real prover should be wrapped in asyncio.to_thread the same way.
+        payload = orjson.dumps(mock_proof_data, option=orjson.OPT_SORT_KEYS)
+        zkp_public_inputs_hash = (await asyncio.to_thread(hashlib.sha256, payload)).hexdigest()
         
         await asyncio.sleep(0.5) # Simulate ZKP generation time
-        print(f"[Pitch Strength Agent] ZKP mock generated for pitch {state.pitch_id}. Hash: {zkp_public_inputs_hash}")
+        print(f"[Pitch Strength Agent] ZKP mock generated for pitch {state['pitch_id']}. Hash: {zkp_public_inputs_hash}")
         return {"zkp_hash": "0x" + zkp_public_inputs_hash} # Store as hex string for on-chain compatibility
     except Exception as e:
         return {"error": f"ZKP generation simulation failed: {e}"}
@@ -163,23 +201,23 @@ async def record_on_chain(state: AgentState) -> AgentState:
     """
     Records the finalized pitch scores and ZKP hash on the blockchain.
     """
-    print(f"\n[Pitch Strength Agent] Recording pitch scores on-chain for ID: {state.pitch_id}...")
-    if state.error or not state.analysis_results or not state.zkp_hash:
+    print(f"\n[Pitch Strength Agent] Recording pitch scores on-chain for ID: {state['pitch_id']}...")
+    if state.get("error") or not state.get("analysis_results") or not state.get("zkp_hash"):
         print("[Pitch Strength Agent] Skipping on-chain record due to prior error or missing data.")
-        return {"error": state.error or "Missing analysis results or ZKP hash for on-chain record."}
+        return {"error": state.get("error") or "Missing analysis results or ZKP hash for on-chain record."}
 
     try:
-        overall_score = state.analysis_results.get("overall_score", 0)
-        component_scores = state.analysis_results.get("components", {})
+        overall_score = state["analysis_results"].get("overall_score", 0)
+        component_scores = state["analysis_results"].get("components", {})
         clarity_score = component_scores.get("clarity", {}).get("score", 0)
         originality_score = component_scores.get("originality", {}).get("score", 0)
         team_strength_score = component_scores.get("team_strength", {}).get("score", 0)
         market_fit_score = component_scores.get("market_fit", {}).get("score", 0)
 
-        # Convert pitch_id to bytes32 for Solidity
-        pitch_id_bytes = bytes.fromhex(state.pitch_id.replace("pitch_", "").ljust(64, '0')[:64]) # Simple mock conversion
+        # Commit to pitch_id as a bytes32 for Solidity (works for any id format)
+        pitch_id_bytes = hashlib.sha256(state["pitch_id"].encode()).digest()
         # Convert zkp_hash to bytes32 for Solidity (remove 0x prefix and pad if needed)
-        zkp_hash_bytes = bytes.fromhex(state.zkp_hash[2:]) if state.zkp_hash else b'\x00' * 32
+        zkp_hash_bytes = bytes.fromhex(state["zkp_hash"][2:]) if state.get("zkp_hash") else b'\x00' * 32
 
         tx_receipt = await web3_client.record_pitch_score(
             pitch_id_bytes,
@@ -201,22 +239,22 @@ async def final_output_format(state: AgentState) -> Dict[str, Any]:
     """
     Prepares the final output for the agent, after on-chain recording.
     """
-    print(f"\n[Pitch Strength Agent] Finalizing agent output for pitch ID: {state.pitch_id}...")
-    if state.error:
-        return {"status": "failed", "pitch_id": state.pitch_id, "error": state.error}
+    print(f"\n[Pitch Strength Agent] Finalizing agent output for pitch ID: {state['pitch_id']}...")
+    if state.get("error"):
+        return {"status": "failed", "pitch_id": state["pitch_id"], "error": state.get("error")}
     else:
         final_data = {
-            "pitch_id": state.pitch_id,
-            "overall_score": state.analysis_results.get("overall_score"),
-            "component_scores": {k: v['score'] for k, v in state.analysis_results.get("components", {}).items()},
+            "pitch_id": state["pitch_id"],
+            "overall_score": state["analysis_results"].get("overall_score"),
+            "component_scores": {k: v['score'] for k, v in state["analysis_results"].get("components", {}).items()},
             "privacy_flags": {
-                "tee_processed": state.tee_processed,
-                "zkp_hash": state.zkp_hash
+                "tee_processed": state.get("tee_processed", False),
+                "zkp_hash": state.get("zkp_hash")
             },
             "status": "completed",
-            "on_chain_tx_hash": state.get("on_chain_tx_hash") # Get tx hash from previous node
+            "on_chain_tx_hash": state.get("on_chain_tx_hash") # Set by the record_on_chain node
         }
-        print(f"[Pitch Strength Agent] Agent workflow finished for pitch {state.pitch_id}.")
+        print(f"[Pitch Strength Agent] Agent workflow finished for pitch {state['pitch_id']}.")
         return final_data
 
 # --- 4. Build the LangGraph Workflow ---
@@ -255,23 +293,21 @@ async def run_pitch_strength_agent(pitch_id: str, pitch_content: str = None, fil
     )
     print(f"\n--- Starting Pitch Strength Agent for Pitch ID: {pitch_id} ---")
     final_state = None
-    # We explicitly iterate through the stream to observe state changes
-    async for step in app.stream(initial_state, {"recursion_limit": 100}):
+    # We explicitly iterate through the stream to observe each node's update.
+    # LangGraph merges every update into the graph state itself, so no local copy is kept.
+    async for step in app.astream(initial_state, {"recursion_limit": 100}):
         # 'step' is a dictionary where keys are node names and values are their outputs
         for node_name, output in step.items():
-            print(f"Node '{node_name}' executed. Output keys: {list(output.keys())}")
-            # Update the 'state' variable to reflect the latest state after each step
-            # This is a common pattern when you want to inspect intermediate states
-            if isinstance(output, dict):
-                # Ensure we are working with the correct state update from the node
-                initial_state = initial_state.copy(update=output)
+            if not output:
+                # Nodes that skip return {}, which the stream reports as None: no state update
+                print(f"Node '{node_name}' executed. No state update.")
+            elif isinstance(output, dict):
+                print(f"Node '{node_name}' executed. Output keys: {list(output.keys())}")
             else:
                 print(f"Warning: Node '{node_name}' did not return a dict. Output: {output}")
-        # After each step, the overall graph state is passed to the next node
-        # The 'END' node's output will be the final result we care about for the entire graph
-        if END in step:
-            final_state = step[END]
-            break # Exit loop once END is reached
+            # The 'output_results' node's output is the final result we care about for the entire graph
+            if node_name == "output_results":
+                final_state = output
 
     print(f"--- Finished Pitch Strength Agent for Pitch ID: {pitch_id} ---")
     # Return the final output from the 'output_results' node, which is the last before END
@@ -290,9 +326,6 @@ if __name__ == "__main__":
     with open(dummy_file_path, "w") as f:
         f.write(dummy_pitch_content_demo)
 
-    # Required for ZKP hash generation mock
-    import hashlib
-
     print("\n--- Running Agent with File Input ---")
     result_file = asyncio.run(run_pitch_strength_agent("pitch_file_001", file_path=dummy_file_path))
     print("\nFinal Result from Agent (File Input):")